@@ -2,14 +2,31 @@
 from __future__ import annotations
 
 import calendar
+import heapq
 import json
 import os
+import sys
 from collections import Counter, OrderedDict, defaultdict
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from statistics import mean, median, stdev
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from math import sqrt
+from operator import itemgetter
 from typing import Any, Callable, Dict, Iterable, List, MutableMapping, Optional, Sequence, Tuple
 
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+else:  # pragma: no cover - depends on the installed orjson release
+    # Older orjson releases read integers wider than 64 bits as lossy floats rather
+    # than rejecting them; only use orjson where json gets the final say on those.
+    try:
+        if isinstance(orjson.loads(b"18446744073709551616"), float):
+            orjson = None
+    except orjson.JSONDecodeError:
+        pass
+
 DISPLAY_CURRENCY = "GBP"
 
 CATEGORY_ALIASES: Dict[str, str] = {
@@ -64,8 +81,19 @@ CONFIG = {
     "rising_mom_threshold": 0.10,
 }
 
+DUPLICATE_WINDOW = timedelta(seconds=300)
+RECENT_WINDOW = timedelta(days=30)
+MERCHANT_LOOKBACK = timedelta(days=60)
+RECURRING_INTERVALS = (7, 14, 30)
+# percentile_value switches from a full sort to heap selection when the needed
+# tail is at most 1/PARTIAL_SELECT_RATIO of the values.
+PARTIAL_SELECT_RATIO = 64
+
 DOW_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 TIME_BUCKETS = ["morning", "afternoon", "evening", "late"]
+TIME_BUCKET_INDEX = {bucket: idx for idx, bucket in enumerate(TIME_BUCKETS)}
+# Time bucket for each hour 0-23: morning 06-11, afternoon 12-17, evening 18-22, late otherwise.
+HOUR_BUCKETS = ["late"] * 6 + ["morning"] * 6 + ["afternoon"] * 6 + ["evening"] * 5 + ["late"]
 
 
 @dataclass(frozen=True)
@@ -85,6 +113,13 @@ def preprocess(transactions: Sequence[MutableMapping[str, Any]]) -> List[Dict[st
 
 def preprocess_transactions(transactions: Sequence[MutableMapping[str, Any]]) -> List[Dict[str, Any]]:
     cleaned: List[Dict[str, Any]] = []
+    # Calendar columns depend only on the transaction's day, so they are derived
+    # once per distinct day and shared by every row that falls on it.
+    day_fields: Dict[date, Tuple[Any, ...]] = {}
+    # Raw category and merchant labels repeat heavily, so each distinct label is
+    # normalised once and interned; every row then shares the same key objects.
+    categories: Dict[Optional[str], str] = {}
+    merchants: Dict[Optional[str], Tuple[str, str]] = {}
     for row in transactions:
         amount = float(row.get("amount", 0))
         currency = row.get("currency", DISPLAY_CURRENCY)
@@ -96,61 +131,91 @@ def preprocess_transactions(transactions: Sequence[MutableMapping[str, Any]]) ->
         if not ts:
             raise ValueError("Missing timestamp field 'ts'.")
         dt = parse_iso_ts(ts)
-        iso_year, iso_week, iso_weekday = dt.isocalendar()
-        category = normalise_category(row.get("category"))
-        merchant = (row.get("merchant") or "unknown").strip()
-        enriched = dict(row)
-        week_key = f"{iso_year}-W{iso_week:02d}"
-        enriched.update(
-            {
-                "amount": amount,
-                "amount_abs": abs(amount),
-                "ts": ts,
-                "dt": dt,
-                "date": dt.date(),
-                "dow": dt.weekday(),
-                "hour": dt.hour,
-                "week": iso_week,
-                "week_year": iso_year,
-                "week_key": week_key,
-                "week_start": start_of_week(dt),
-                "month": dt.strftime("%Y-%m"),
-                "month_key": dt.strftime("%Y-%m"),
-                "month_start": dt.replace(day=1).date(),
-                "is_spend": amount < 0,
-                "is_income": amount > 0,
-                "category": category,
-                "merchant": merchant,
-                "merchant_normalised": merchant.lower(),
-                "time_bucket": time_of_day_bucket(dt.hour),
-                "iso_weekday": iso_weekday,
-            }
-        )
+        day = dt.date()
+        hour = dt.hour
+        fields = day_fields.get(day)
+        if fields is None:
+            fields = day_fields[day] = calendar_fields(day)
+        dow, iso_year, iso_week, week_key, week_start, month_key, month_start, iso_weekday, day_ordinal = fields
+        raw_category = row.get("category")
+        category = categories.get(raw_category)
+        if category is None:
+            category = categories[raw_category] = sys.intern(normalise_category(raw_category))
+        raw_merchant = row.get("merchant")
+        merchant_names = merchants.get(raw_merchant)
+        if merchant_names is None:
+            merchant = (raw_merchant or "unknown").strip()
+            merchant_names = merchants[raw_merchant] = (sys.intern(merchant), sys.intern(merchant.lower()))
+        merchant, merchant_normalised = merchant_names
+        enriched = {
+            **row,
+            "amount": amount,
+            "amount_abs": abs(amount),
+            "ts": ts,
+            "dt": dt,
+            "date": day,
+            "dow": dow,
+            "hour": hour,
+            "week": iso_week,
+            "week_year": iso_year,
+            "week_key": week_key,
+            "week_start": week_start,
+            "month": month_key,
+            "month_key": month_key,
+            "month_start": month_start,
+            "is_spend": amount < 0,
+            "is_income": amount > 0,
+            "category": category,
+            "merchant": merchant,
+            "merchant_normalised": merchant_normalised,
+            "time_bucket": HOUR_BUCKETS[hour],
+            "iso_weekday": iso_weekday,
+            "day_ordinal": day_ordinal,
+        }
         cleaned.append(enriched)
 
+    # Downstream stages rely on chronological rows; exports are usually already
+    # ordered, which makes this stable sort close to a linear scan.
+    cleaned.sort(key=itemgetter("dt"))
     winsorise_spend_amounts(cleaned, CONFIG["winsorise_percentile"])
     return cleaned
 
 
+def calendar_fields(day: date) -> Tuple[Any, ...]:
+    """Return (dow, iso_year, iso_week, week_key, week_start, month_key, month_start, iso_weekday, day_ordinal)."""
+    iso_year, iso_week, iso_weekday = day.isocalendar()
+    dow = iso_weekday - 1
+    year, month = day.year, day.month
+    return (
+        dow,
+        iso_year,
+        iso_week,
+        f"{iso_year}-W{iso_week:02d}",
+        day - timedelta(days=dow),
+        f"{year:04d}-{month:02d}",
+        date(year, month, 1),
+        iso_weekday,
+        day.toordinal(),
+    )
+
+
+@lru_cache(maxsize=65536)
 def parse_iso_ts(value: str) -> datetime:
+    # Batch exports often repeat timestamps; datetimes are immutable so cached values are safe to share.
     if value.endswith("Z"):
-        value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value[:-1]).replace(tzinfo=timezone.utc)
     return datetime.fromisoformat(value)
 
 
 def normalise_category(raw: Optional[str]) -> str:
+    if raw in CATEGORY_ALIASES:
+        return CATEGORY_ALIASES[raw]
     raw_norm = (raw or "uncategorised").strip().lower()
     return CATEGORY_ALIASES.get(raw_norm, raw_norm or "uncategorised")
 
 
 def time_of_day_bucket(hour: int) -> str:
-    if 6 <= hour <= 11:
-        return "morning"
-    if 12 <= hour <= 17:
-        return "afternoon"
-    if 18 <= hour <= 22:
-        return "evening"
-    return "late"
+    return HOUR_BUCKETS[hour]
 
 
 def start_of_week(dt: datetime) -> datetime.date:
@@ -158,19 +223,18 @@ def start_of_week(dt: datetime) -> datetime.date:
 
 
 def winsorise_spend_amounts(rows: Sequence[MutableMapping[str, Any]], percentile: float) -> None:
-    per_category_values: Dict[str, List[float]] = defaultdict(list)
-    for row in rows:
-        if row.get("is_spend"):
-            per_category_values[row["category"]].append(abs(row["amount"]))
-    caps = {cat: percentile_value(values, percentile) for cat, values in per_category_values.items()}
+    spend_by_category: Dict[str, List[MutableMapping[str, Any]]] = defaultdict(list)
     for row in rows:
-        amount = row["amount"]
         if row.get("is_spend"):
-            cap = caps.get(row["category"], abs(amount))
-            clipped = -min(abs(amount), cap)
+            spend_by_category[row["category"]].append(row)
         else:
-            clipped = amount
-        row["amount_winsorised"] = clipped
+            row["amount_winsorised"] = row["amount"]
+    # Clip category by category so each cap is computed and looked up once. The
+    # value lists are private, so they are sorted in place rather than copied.
+    for category_rows in spend_by_category.values():
+        cap = _percentile_in_place([row["amount_abs"] for row in category_rows], percentile)
+        for row in category_rows:
+            row["amount_winsorised"] = -min(row["amount_abs"], cap)
 
 
 # ---------------------------------------------------------------------------
@@ -186,47 +250,44 @@ def monthly_trends(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
 def compute_monthly_trends(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
     spend_totals: Dict[str, float] = defaultdict(float)
     income_totals: Dict[str, float] = defaultdict(float)
-    category_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    category_totals: Dict[Tuple[str, str], float] = defaultdict(float)
 
     for row in rows:
         month = row["month_key"]
         amount = row.get("amount_winsorised", row["amount"])
         if row.get("is_spend"):
-            spend_totals[month] += abs(amount)
-            category_totals[row["category"]][month] += abs(amount)
+            spend = abs(amount)
+            spend_totals[month] += spend
+            category_totals[(row["category"], month)] += spend
         elif row.get("is_income"):
             income_totals[month] += amount
 
+    # Densify every series onto the shared month axis once; the ordered dicts,
+    # moving averages, MoM deltas and slopes below all reuse these lists.
     months = ordered_months({*spend_totals.keys(), *income_totals.keys()})
-    monthly_spend = OrderedDict((month, spend_totals.get(month, 0.0)) for month in months)
-    monthly_income = OrderedDict((month, income_totals.get(month, 0.0)) for month in months)
+    spend_series = MonthlySeries(months=months, values=[spend_totals.get(month, 0.0) for month in months])
+    income_series = MonthlySeries(months=months, values=[income_totals.get(month, 0.0) for month in months])
+    monthly_spend = OrderedDict(zip(months, spend_series.values))
+    monthly_income = OrderedDict(zip(months, income_series.values))
 
-    spend_series = MonthlySeries(months=list(monthly_spend.keys()), values=list(monthly_spend.values()))
-    income_series = MonthlySeries(months=list(monthly_income.keys()), values=list(monthly_income.values()))
-
-    spend_mavg = OrderedDict(
-        (month, avg) for month, avg in zip(spend_series.months, rolling_mean(spend_series.values, window=3))
-    )
-    income_mavg = OrderedDict(
-        (month, avg) for month, avg in zip(income_series.months, rolling_mean(income_series.values, window=3))
-    )
+    spend_mavg = OrderedDict(zip(months, rolling_mean(spend_series.values, window=3)))
+    income_mavg = OrderedDict(zip(months, rolling_mean(income_series.values, window=3)))
 
     spend_mom = month_over_month(spend_series)
     income_mom = month_over_month(income_series)
 
-    category_spend = {
-        category: OrderedDict((month, months_map.get(month, 0.0)) for month in months)
-        for category, months_map in category_totals.items()
+    categories = dict.fromkeys(category for category, _ in category_totals)
+    category_values = {
+        category: [category_totals.get((category, month), 0.0) for month in months] for category in categories
     }
+    category_spend = {category: OrderedDict(zip(months, values)) for category, values in category_values.items()}
 
     category_share = compute_category_share(monthly_spend, category_spend)
 
     trend_slopes = {
         "total_spend": linear_trend(spend_series.values),
         "total_income": linear_trend(income_series.values),
-        "categories": {
-            category: linear_trend(list(series.values())) for category, series in category_spend.items()
-        },
+        "categories": {category: linear_trend(values) for category, values in category_values.items()},
     }
 
     return {
@@ -243,7 +304,8 @@ def compute_monthly_trends(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str
 
 
 def ordered_months(months: Iterable[str]) -> List[str]:
-    return sorted(months, key=lambda m: datetime.strptime(m, "%Y-%m"))
+    # "YYYY-MM" keys already sort chronologically as plain strings.
+    return sorted(months)
 
 
 def month_over_month(series: MonthlySeries) -> Dict[str, Optional[float]]:
@@ -274,12 +336,10 @@ def forecast_next_month(monthly_spend: OrderedDict) -> Optional[Dict[str, Any]]:
         return None
     months = list(monthly_spend.keys())
     values = list(monthly_spend.values())
-    last_month = months[-1]
-    last_dt = datetime.strptime(last_month, "%Y-%m")
-    next_dt = add_months(last_dt, 1)
-    next_month_key = next_dt.strftime("%Y-%m")
+    next_index = month_index(months[-1]) + 1
+    next_month_key = month_key_from_index(next_index)
 
-    seasonal_key = add_months(next_dt, -12).strftime("%Y-%m")
+    seasonal_key = month_key_from_index(next_index - 12)
     seasonal = monthly_spend.get(seasonal_key)
     if seasonal is None and values:
         seasonal = values[-1]
@@ -308,8 +368,13 @@ def forecast_next_month(monthly_spend: OrderedDict) -> Optional[Dict[str, Any]]:
 # Pattern mining utilities
 # ---------------------------------------------------------------------------
 
-def pattern_mining(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
-    spend_rows = [row for row in rows if row.get("is_spend")]
+def pattern_mining(
+    rows: Sequence[MutableMapping[str, Any]],
+    presorted: bool = False,
+    spend_rows: Optional[Sequence[MutableMapping[str, Any]]] = None,
+) -> Dict[str, Any]:
+    if spend_rows is None:
+        spend_rows = [row for row in rows if row.get("is_spend")]
     if not spend_rows:
         return {
             "dow_peaks": {},
@@ -323,27 +388,30 @@ def pattern_mining(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
             "category_30d_spend": {},
         }
 
+    # Day-of-week and time-bucket spend are fixed-width per category, so they
+    # accumulate into flat per-category arrays indexed by dow / bucket position.
     category_totals: Dict[str, float] = defaultdict(float)
-    category_dow: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
-    category_time: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    category_dow: Dict[str, List[float]] = defaultdict(lambda: [0.0] * len(DOW_NAMES))
+    category_time: Dict[str, List[float]] = defaultdict(lambda: [0.0] * len(TIME_BUCKETS))
 
-    latest_dt = max(row["dt"] for row in rows)
+    latest_dt = latest_timestamp(rows, presorted)
     cutoff_8w = latest_dt - timedelta(weeks=CONFIG["hhi_window_weeks"])
-    cutoff_30d = latest_dt - timedelta(days=30)
+    cutoff_30d = latest_dt - RECENT_WINDOW
 
     merchant_window: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
     category_30d_spend: Dict[str, float] = defaultdict(float)
 
     for row in spend_rows:
         cat = row["category"]
-        amt = abs(row["amount"])
+        amt = row["amount_abs"]
         category_totals[cat] += amt
         category_dow[cat][row["dow"]] += amt
-        category_time[cat][row["time_bucket"]] += amt
-        if row["dt"] >= cutoff_8w:
-            merchant_window[cat][row["merchant_normalised"]] += amt
-        if row["dt"] >= cutoff_30d:
-            category_30d_spend[cat] += amt
+        category_time[cat][TIME_BUCKET_INDEX[row["time_bucket"]]] += amt
+    # Recent windows are tail slices when the rows are known to be time-ordered.
+    for row in rows_since(spend_rows, cutoff_8w, presorted):
+        merchant_window[row["category"]][row["merchant_normalised"]] += row["amount_abs"]
+    for row in rows_since(spend_rows, cutoff_30d, presorted):
+        category_30d_spend[row["category"]] += row["amount_abs"]
 
     dow_peaks: Dict[str, List[str]] = {}
     time_bucket_shares: Dict[str, Dict[str, float]] = {}
@@ -351,21 +419,17 @@ def pattern_mining(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
     for cat, total in category_totals.items():
         if not total:
             continue
-        dow_shares = {DOW_NAMES[dow]: value / total for dow, value in category_dow[cat].items()}
+        dow_shares = {DOW_NAMES[dow]: value / total for dow, value in enumerate(category_dow[cat]) if value}
         if dow_shares:
             max_share = max(dow_shares.values())
             peaks = [dow for dow, share in dow_shares.items() if share >= max_share - 0.05 and share >= 0.2]
             if peaks:
                 dow_peaks[cat] = peaks
-        bucket_shares = {}
-        for bucket in TIME_BUCKETS:
-            bucket_total = category_time[cat].get(bucket, 0.0)
-            if total:
-                bucket_shares[bucket] = bucket_total / total
-        if bucket_shares:
-            time_bucket_shares[cat] = bucket_shares
-        late_share = bucket_shares.get("evening", 0.0) + bucket_shares.get("late", 0.0)
-        late_amount = category_time[cat].get("evening", 0.0) + category_time[cat].get("late", 0.0)
+        bucket_totals = category_time[cat]
+        bucket_shares = {bucket: value / total for bucket, value in zip(TIME_BUCKETS, bucket_totals)}
+        time_bucket_shares[cat] = bucket_shares
+        late_share = bucket_shares["evening"] + bucket_shares["late"]
+        late_amount = bucket_totals[TIME_BUCKET_INDEX["evening"]] + bucket_totals[TIME_BUCKET_INDEX["late"]]
         if late_share:
             late_night[cat] = {"share": late_share, "amount": late_amount}
 
@@ -406,15 +470,16 @@ def pattern_mining(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
 def compute_small_leaks(spend_rows: Sequence[MutableMapping[str, Any]]) -> List[Dict[str, Any]]:
     limit = CONFIG["small_tx_week_limit"]
     threshold = CONFIG["small_tx_threshold"]
+    rise_factor = 1 + CONFIG["drip_rise_min_delta"]
     leaks: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "total": 0.0})
     for row in spend_rows:
-        if abs(row["amount"]) < threshold and row["category"] not in NECESSITY_CATEGORIES:
+        if row["amount_abs"] < threshold and row["category"] not in NECESSITY_CATEGORIES:
             entry = leaks[row["week_key"]]
             entry["count"] += 1
-            entry["total"] += abs(row["amount"])
+            entry["total"] += row["amount_abs"]
 
     leak_weeks: List[Dict[str, Any]] = []
-    sorted_weeks = sorted(leaks.keys(), key=week_key_to_date)
+    sorted_weeks = sorted(leaks)
     prev_count = None
     for week in sorted_weeks:
         data = leaks[week]
@@ -422,7 +487,7 @@ def compute_small_leaks(spend_rows: Sequence[MutableMapping[str, Any]]) -> List[
         avg = data["total"] / count if count else 0.0
         rising = False
         if prev_count is not None and prev_count > 0:
-            rising = count > prev_count * (1 + CONFIG["drip_rise_min_delta"])
+            rising = count > prev_count * rise_factor
         prev_count = count
         if count > limit:
             leak_weeks.append(
@@ -441,21 +506,18 @@ def compute_cashflow(rows: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]
     weekly_net: Dict[str, float] = defaultdict(float)
     for row in rows:
         weekly_net[row["week_key"]] += row["amount"]
-    ordered_weeks = sorted(weekly_net.keys(), key=week_key_to_date)
-    ordered = OrderedDict((week, weekly_net[week]) for week in ordered_weeks)
-
-    squeezes: List[Dict[str, Any]] = []
-    for idx in range(len(ordered_weeks) - 1):
-        curr_key = ordered_weeks[idx]
-        next_key = ordered_weeks[idx + 1]
-        if ordered[curr_key] < 0 and ordered[next_key] > 0:
-            squeezes.append(
-                {
-                    "week": curr_key,
-                    "net": ordered[curr_key],
-                    "following_week": next_key,
-                }
-            )
+    ordered = OrderedDict((week, weekly_net[week]) for week in sorted(weekly_net))
+
+    weeks = list(ordered.items())
+    squeezes: List[Dict[str, Any]] = [
+        {
+            "week": curr_key,
+            "net": curr_net,
+            "following_week": next_key,
+        }
+        for (curr_key, curr_net), (next_key, next_net) in zip(weeks, weeks[1:])
+        if curr_net < 0 and next_net > 0
+    ]
 
     return {"weekly_net": ordered, "squeezes": squeezes}
 
@@ -467,7 +529,7 @@ def compute_ridehail_usage(spend_rows: Sequence[MutableMapping[str, Any]]) -> Di
     current_month = max(row["month_key"] for row in ridehail_rows)
     current_rows = [row for row in ridehail_rows if row["month_key"] == current_month]
     count = len(current_rows)
-    spend = sum(abs(row["amount"]) for row in current_rows)
+    spend = sum(row["amount_abs"] for row in current_rows)
     avg = spend / count if count else 0.0
     return {
         "month": current_month,
@@ -478,6 +540,8 @@ def compute_ridehail_usage(spend_rows: Sequence[MutableMapping[str, Any]]) -> Di
 
 
 def week_key_to_date(week_key: str) -> datetime:
+    # Zero-padded "YYYY-Www" keys sort chronologically as strings; only use this
+    # when an actual date is needed.
     year_str, week_part = week_key.split("-W")
     year = int(year_str)
     week = int(week_part)
@@ -488,49 +552,49 @@ def week_key_to_date(week_key: str) -> datetime:
 # Recurring / subscriptions
 # ---------------------------------------------------------------------------
 
-def detect_recurring(rows: Sequence[MutableMapping[str, Any]]) -> List[Dict[str, Any]]:
-    spend_rows = [row for row in rows if row.get("is_spend")]
+def detect_recurring(
+    rows: Sequence[MutableMapping[str, Any]],
+    presorted: bool = False,
+    spend_rows: Optional[Sequence[MutableMapping[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    if spend_rows is None:
+        spend_rows = [row for row in rows if row.get("is_spend")]
     if not spend_rows:
         return []
 
-    latest_dt = max(row["dt"] for row in rows)
-    cutoff_60 = latest_dt - timedelta(days=60)
+    cutoff_60 = latest_timestamp(rows, presorted) - MERCHANT_LOOKBACK
     category_merchants_last60: Dict[str, set] = defaultdict(set)
-    for row in rows:
-        if row["dt"] >= cutoff_60:
-            category_merchants_last60[row["category"]].add(row["merchant_normalised"])
+    for row in rows_since(rows, cutoff_60, presorted):
+        category_merchants_last60[row["category"]].add(row["merchant_normalised"])
 
+    # Merchant groups inherit the row order; only presorted input can skip the per-group sort.
     by_merchant: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
     for row in spend_rows:
         by_merchant[row["merchant_normalised"]].append(row)
 
+    min_occurrences = CONFIG["recurring_min_occurrences"]
+    cv_threshold = CONFIG["recurring_cv_threshold"]
     recurring: List[Dict[str, Any]] = []
     for merchant_key, txs in by_merchant.items():
-        if len(txs) < CONFIG["recurring_min_occurrences"]:
-            continue
-        txs.sort(key=lambda r: r["dt"])
-        amounts = [abs(t["amount"]) for t in txs]
-        avg_amount = sum(amounts) / len(amounts)
-        if avg_amount == 0:
+        if len(txs) < min_occurrences:
             continue
-        if len(amounts) > 1:
-            std_amount = stdev(amounts)
-        else:
-            std_amount = 0.0
-        cv = std_amount / avg_amount if avg_amount else 0.0
-        if cv > CONFIG["recurring_cv_threshold"]:
-            continue
-        intervals = [max((txs[i]["dt"].date() - txs[i - 1]["dt"].date()).days, 1) for i in range(1, len(txs))]
-        if not intervals:
+        if not presorted:
+            txs.sort(key=itemgetter("dt"))
+        stats = _recurring_stats(
+            [t["amount_abs"] for t in txs],
+            [t["day_ordinal"] for t in txs],
+            [t["date"].day for t in txs],
+            cv_threshold,
+        )
+        if stats is None:
             continue
-        med_interval = median(intervals)
+        cv, med_interval, pay_day, median_abs_amount = stats
         interval = match_interval(med_interval)
         if interval is None:
             continue
-        pay_day = int(round(median([tx["dt"].day for tx in txs])))
         category = Counter(tx["category"] for tx in txs).most_common(1)[0][0]
         display_name = Counter(tx["merchant"] for tx in txs).most_common(1)[0][0]
-        median_amount = -median(amounts)
+        median_amount = -median_abs_amount
         ghost = False
         merchants_in_category = category_merchants_last60.get(category, set())
         if interval == 30 and len(merchants_in_category - {merchant_key}) == 0:
@@ -556,10 +620,32 @@ def detect_recurring(rows: Sequence[MutableMapping[str, Any]]) -> List[Dict[str,
     return recurring
 
 
+def _recurring_stats(
+    amounts: Sequence[float],
+    day_ordinals: Sequence[int],
+    days_of_month: Sequence[int],
+    cv_threshold: float,
+) -> Optional[Tuple[float, float, int, float]]:
+    """Numeric core of detect_recurring: (cv, median interval, pay day, median amount).
+
+    Returns None as soon as the amounts are too irregular to be a recurring charge.
+    """
+    mean_amount, std_amount = mean_std(amounts)
+    if mean_amount == 0:
+        return None
+    cv = std_amount / mean_amount
+    if cv > cv_threshold:
+        return None
+    intervals = [max(curr - prev, 1) for prev, curr in zip(day_ordinals, day_ordinals[1:])]
+    if not intervals:
+        return None
+    return cv, median_value(intervals), int(round(median_value(days_of_month))), median_value(amounts)
+
+
 def match_interval(value: float) -> Optional[int]:
-    candidates = [7, 14, 30]
-    for candidate in candidates:
-        if abs(value - candidate) <= CONFIG["recurring_interval_tolerance"]:
+    tolerance = CONFIG["recurring_interval_tolerance"]
+    for candidate in RECURRING_INTERVALS:
+        if abs(value - candidate) <= tolerance:
             return candidate
     return None
 
@@ -568,49 +654,43 @@ def match_interval(value: float) -> Optional[int]:
 # Anomaly detection
 # ---------------------------------------------------------------------------
 
-def detect_anomalies(rows: Sequence[MutableMapping[str, Any]]) -> List[Dict[str, Any]]:
-    spend_rows = [row for row in rows if row.get("is_spend")]
+def detect_anomalies(
+    rows: Sequence[MutableMapping[str, Any]],
+    presorted: bool = False,
+    spend_rows: Optional[Sequence[MutableMapping[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    if spend_rows is None:
+        spend_rows = [row for row in rows if row.get("is_spend")]
     anomalies: List[Dict[str, Any]] = []
     if not spend_rows:
         return anomalies
 
     weekly_category: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
     for row in spend_rows:
-        weekly_category[row["category"]][row["week_key"]] += abs(row["amount"])
+        weekly_category[row["category"]][row["week_key"]] += row["amount_abs"]
 
+    window = CONFIG["anomaly_window_weeks"]
+    z_threshold = CONFIG["anomaly_z_threshold"]
+    delta_threshold = CONFIG["anomaly_week_delta"]
     for category, week_map in weekly_category.items():
-        weeks = sorted(week_map.keys(), key=week_key_to_date)
-        for idx in range(1, len(weeks)):
-            window_start = max(0, idx - CONFIG["anomaly_window_weeks"])
-            history = [week_map[weeks[j]] for j in range(window_start, idx)]
-            if len(history) < 2:
-                continue
-            curr_week = weeks[idx]
-            curr_value = week_map[curr_week]
-            mean_history = mean(history)
-            std_history = stdev(history)
-            prev_week = weeks[idx - 1]
-            prev_value = week_map[prev_week]
-            if std_history == 0:
-                continue
-            z_score = (curr_value - mean_history) / std_history
-            pct_delta = pct_change(curr_value, prev_value)
-            if z_score > CONFIG["anomaly_z_threshold"] and (pct_delta or 0) > CONFIG["anomaly_week_delta"]:
-                anomalies.append(
-                    {
-                        "category": category,
-                        "period": curr_week,
-                        "amount": curr_value,
-                        "z": z_score,
-                        "reason": "spike_vs_rolling",
-                    }
-                )
+        weeks = sorted(week_map)
+        values = [week_map[week] for week in weeks]
+        for idx, z_score in rolling_spikes(values, window, z_threshold, delta_threshold):
+            anomalies.append(
+                {
+                    "category": category,
+                    "period": weeks[idx],
+                    "amount": values[idx],
+                    "z": z_score,
+                    "reason": "spike_vs_rolling",
+                }
+            )
 
-    non_rent_values = [abs(row["amount"]) for row in spend_rows if row["category"] not in RENT_CATEGORIES]
-    percentile = percentile_value(non_rent_values, 0.99) if non_rent_values else 0.0
+    non_rent_values = [row["amount_abs"] for row in spend_rows if row["category"] not in RENT_CATEGORIES]
+    percentile = _percentile_in_place(non_rent_values, 0.99)
     if percentile:
         for row in spend_rows:
-            value = abs(row["amount"])
+            value = row["amount_abs"]
             if row["category"] in RENT_CATEGORIES:
                 continue
             if value >= percentile and value > 0:
@@ -624,31 +704,83 @@ def detect_anomalies(rows: Sequence[MutableMapping[str, Any]]) -> List[Dict[str,
                     }
                 )
 
-    seen: Dict[Tuple[str, float], datetime] = {}
-    for row in sorted(spend_rows, key=lambda r: r["dt"]):
-        key = (row["merchant_normalised"], round(row["amount"], 2))
-        previous = seen.get(key)
-        if previous and abs((row["dt"] - previous).total_seconds()) <= 300:
-            anomalies.append(
-                {
-                    "category": row["category"],
-                    "period": row["ts"],
-                    "amount": abs(row["amount"]),
-                    "reason": "potential_duplicate",
-                    "merchant": row["merchant"],
-                }
-            )
-        seen[key] = row["dt"]
+    for row in potential_duplicates(spend_rows, presorted):
+        anomalies.append(
+            {
+                "category": row["category"],
+                "period": row["ts"],
+                "amount": row["amount_abs"],
+                "reason": "potential_duplicate",
+                "merchant": row["merchant"],
+            }
+        )
 
     return anomalies
 
 
+def rolling_spikes(
+    values: Sequence[float],
+    window: int,
+    z_threshold: float,
+    delta_threshold: float,
+) -> List[Tuple[int, float]]:
+    """(index, z) for values spiking against their trailing window and the previous value."""
+    spikes: List[Tuple[int, float]] = []
+    for idx in range(2, len(values)):
+        mean_history, std_history = mean_std(values[max(0, idx - window) : idx])
+        if std_history == 0:
+            continue
+        curr_value = values[idx]
+        z_score = (curr_value - mean_history) / std_history
+        if z_score > z_threshold and (pct_change(curr_value, values[idx - 1]) or 0) > delta_threshold:
+            spikes.append((idx, z_score))
+    return spikes
+
+
+def potential_duplicates(
+    spend_rows: Sequence[MutableMapping[str, Any]], presorted: bool = False
+) -> List[MutableMapping[str, Any]]:
+    """Rows charged again by the same merchant for the same amount within the duplicate window.
+
+    Pass presorted=True only for rows already in time order, as produced by preprocess().
+    """
+    by_merchant: Dict[str, List[Tuple[datetime, int]]] = defaultdict(list)
+    for idx, row in enumerate(spend_rows):
+        by_merchant[row["merchant_normalised"]].append((row["dt"], idx))
+
+    window = DUPLICATE_WINDOW
+    flagged: List[Tuple[datetime, int]] = []
+    for charges in by_merchant.values():
+        if not presorted:
+            charges.sort()
+        # Sweep each merchant's charges in time order, only looking back across
+        # the few neighbours that still fall inside the window.
+        for pos in range(1, len(charges)):
+            dt, idx = charges[pos]
+            amount = None
+            back = pos - 1
+            while back >= 0 and dt - charges[back][0] <= window:
+                if amount is None:
+                    amount = round(spend_rows[idx]["amount"], 2)
+                if round(spend_rows[charges[back][1]]["amount"], 2) == amount:
+                    flagged.append(charges[pos])
+                    break
+                back -= 1
+    flagged.sort()
+    return [spend_rows[idx] for _, idx in flagged]
+
+
 # ---------------------------------------------------------------------------
 # Variance & opportunity sizing
 # ---------------------------------------------------------------------------
 
-def compute_variances(rows: Sequence[MutableMapping[str, Any]], baselines: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
-    spend_rows = [row for row in rows if row.get("is_spend")]
+def compute_variances(
+    rows: Sequence[MutableMapping[str, Any]],
+    baselines: Optional[Dict[str, float]] = None,
+    spend_rows: Optional[Sequence[MutableMapping[str, Any]]] = None,
+) -> Dict[str, Any]:
+    if spend_rows is None:
+        spend_rows = [row for row in rows if row.get("is_spend")]
     if not spend_rows:
         return {
             "per_category": {},
@@ -668,10 +800,11 @@ def compute_variances(rows: Sequence[MutableMapping[str, Any]], baselines: Optio
     current_month = months[-1]
     previous_months = months[:-1][-3:]
 
-    category_monthly: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    category_monthly: Dict[Tuple[str, str], float] = defaultdict(float)
     for row in spend_rows:
-        category_monthly[row["category"]][row["month_key"]] += abs(row["amount"])
+        category_monthly[(row["category"], row["month_key"])] += row["amount_abs"]
 
+    cap_ratio = CONFIG["opportunity_cap_ratio"]
     per_category: Dict[str, Dict[str, Any]] = {}
     total_projection = 0.0
     total_baseline = 0.0
@@ -680,29 +813,28 @@ def compute_variances(rows: Sequence[MutableMapping[str, Any]], baselines: Optio
         (row["date"].day for row in spend_rows if row["month_key"] == current_month),
         default=0,
     )
-    for category, month_map in category_monthly.items():
+    for category in dict.fromkeys(category for category, _ in category_monthly):
+        previous_values = [category_monthly.get((category, m), 0.0) for m in previous_months]
         baseline = None
         if baselines and category in baselines:
             baseline = baselines[category]
         else:
-            history = [month_map.get(m, 0.0) for m in previous_months if month_map.get(m, 0.0) > 0]
+            history = [value for value in previous_values if value > 0]
             if history:
-                baseline = median(history)
+                baseline = median_value(history)
             elif previous_months:
-                baseline = month_map.get(previous_months[-1], 0.0)
+                baseline = previous_values[-1]
             else:
                 baseline = 0.0
-        spent_so_far = month_map.get(current_month, 0.0)
+        spent_so_far = category_monthly.get((category, current_month), 0.0)
         projection = spent_so_far
         if day_of_month and day_of_month < days_in_current:
             projection = spent_so_far / max(day_of_month, 1) * days_in_current
         variance = projection - (baseline or 0.0)
         opportunity = 0.0
         if (baseline or 0.0) > 0 and variance > 0:
-            opportunity = min(variance, baseline * CONFIG["opportunity_cap_ratio"])
-        prev_month = previous_months[-1] if previous_months else None
-        prev_value = month_map.get(prev_month, 0.0) if prev_month else 0.0
-        mom_pct = pct_change(month_map.get(current_month, 0.0), prev_value) if prev_month else None
+            opportunity = min(variance, baseline * cap_ratio)
+        mom_pct = pct_change(spent_so_far, previous_values[-1]) if previous_months else None
         per_category[category] = {
             "baseline": baseline or 0.0,
             "projection": projection,
@@ -724,8 +856,19 @@ def compute_variances(rows: Sequence[MutableMapping[str, Any]], baselines: Optio
 
 
 def month_days(month_key: str) -> int:
+    year, month0 = divmod(month_index(month_key), 12)
+    return calendar.monthrange(year, month0 + 1)[1]
+
+
+def month_index(month_key: str) -> int:
+    """Months since year 0 for a "YYYY-MM" key, so month arithmetic is plain integer maths."""
     year_str, month_str = month_key.split("-")
-    return calendar.monthrange(int(year_str), int(month_str))[1]
+    return int(year_str) * 12 + int(month_str) - 1
+
+
+def month_key_from_index(index: int) -> str:
+    year, month0 = divmod(index, 12)
+    return f"{year:04d}-{month0 + 1:02d}"
 
 
 # ---------------------------------------------------------------------------
@@ -740,12 +883,15 @@ def build_suggestions(
     variances: Dict[str, Any],
 ) -> List[Dict[str, Any]]:
     suggestions: List[Dict[str, Any]] = []
-    suggestions.extend(subscription_suggestions(recurring, patterns))
-    suggestions.extend(merchant_swap_suggestions(patterns))
-    suggestions.extend(drip_spend_suggestions(patterns))
-    suggestions.extend(late_night_suggestions(patterns))
-    suggestions.extend(ridehail_suggestions(patterns))
-    suggestions.extend(cashflow_buffer_suggestions(patterns, recurring))
+    extend = suggestions.extend
+    # Skip builders whose input feature is absent; sparse users often have several.
+    if recurring:
+        extend(subscription_suggestions(recurring, patterns))
+    for feature, builder in _PATTERN_BUILDERS:
+        if patterns.get(feature):
+            extend(builder(patterns))
+    if recurring and patterns.get("cashflow", {}).get("squeezes"):
+        extend(cashflow_buffer_suggestions(patterns, recurring))
     return suggestions[:10]
 
 
@@ -782,32 +928,28 @@ def subscription_suggestions(recurring: List[Dict[str, Any]], patterns: Dict[str
 
 def merchant_swap_suggestions(patterns: Dict[str, Any]) -> List[Dict[str, Any]]:
     details = patterns.get("merchant_hhi_details", {})
-    results: List[Dict[str, Any]] = []
-    for category, info in details.items():
-        if category not in SWAP_ELIGIBLE_CATEGORIES:
-            continue
-        if info["hhi"] <= CONFIG["hhi_high_threshold"]:
-            continue
-        expected_saving = info["total"] * 0.1 * info["top_share"]
-        results.append(
-            {
-                "title": f"Swap out pricey {humanise_category(category)} merchants",
-                "insight": (
-                    f"{humanise_category(category)} spend is {info['hhi']:.2f} HHI; {info['top_merchant'].title()} accounts for {info['top_share']*100:.0f}%"
-                ),
-                "evidence": {
-                    "top_merchant": info["top_merchant"],
-                    "top_share": info["top_share"],
-                    "hhi": info["hhi"],
-                },
-                "action": "Shift at least half of orders to a lower-cost alternative or loyalty offer.",
-                "expected_saving": expected_saving,
-                "confidence": 0.6,
-                "category": category,
-                "type": "swap",
-            }
-        )
-    return results
+    eligible = SWAP_ELIGIBLE_CATEGORIES
+    hhi_threshold = CONFIG["hhi_high_threshold"]
+    return [
+        {
+            "title": f"Swap out pricey {humanise_category(category)} merchants",
+            "insight": (
+                f"{humanise_category(category)} spend is {info['hhi']:.2f} HHI; {info['top_merchant'].title()} accounts for {info['top_share']*100:.0f}%"
+            ),
+            "evidence": {
+                "top_merchant": info["top_merchant"],
+                "top_share": info["top_share"],
+                "hhi": info["hhi"],
+            },
+            "action": "Shift at least half of orders to a lower-cost alternative or loyalty offer.",
+            "expected_saving": info["total"] * 0.1 * info["top_share"],
+            "confidence": 0.6,
+            "category": category,
+            "type": "swap",
+        }
+        for category, info in details.items()
+        if category in eligible and info["hhi"] > hhi_threshold
+    ]
 
 
 def drip_spend_suggestions(patterns: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -836,33 +978,27 @@ def drip_spend_suggestions(patterns: Dict[str, Any]) -> List[Dict[str, Any]]:
 
 
 def late_night_suggestions(patterns: Dict[str, Any]) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
     late_night = patterns.get("late_night", {})
     category_spend = patterns.get("category_30d_spend", {})
-    for category, stats in late_night.items():
-        if category not in LATE_NIGHT_CATEGORIES:
-            continue
-        if stats["share"] < 0.35:
-            continue
-        projected = category_spend.get(category, 0.0) * 1.33
-        expected_saving = stats["amount"] * 0.3
-        results.append(
-            {
-                "title": f"Cut late-night {humanise_category(category)} by 30%",
-                "insight": f"{humanise_category(category)} is {stats['share']*100:.0f}% after 18:00.",
-                "evidence": {
-                    "time_peak": "evening+late",
-                    "last_30d_spend": category_spend.get(category, 0.0),
-                    "projection": projected,
-                },
-                "action": "Pre-plan meals and limit post-21:00 orders to 1 night/week.",
-                "expected_saving": expected_saving,
-                "confidence": 0.6,
-                "category": category,
-                "type": "behavioural_nudge",
-            }
-        )
-    return results
+    eligible = LATE_NIGHT_CATEGORIES
+    return [
+        {
+            "title": f"Cut late-night {humanise_category(category)} by 30%",
+            "insight": f"{humanise_category(category)} is {stats['share']*100:.0f}% after 18:00.",
+            "evidence": {
+                "time_peak": "evening+late",
+                "last_30d_spend": category_spend.get(category, 0.0),
+                "projection": category_spend.get(category, 0.0) * 1.33,
+            },
+            "action": "Pre-plan meals and limit post-21:00 orders to 1 night/week.",
+            "expected_saving": stats["amount"] * 0.3,
+            "confidence": 0.6,
+            "category": category,
+            "type": "behavioural_nudge",
+        }
+        for category, stats in late_night.items()
+        if category in eligible and stats["share"] >= 0.35
+    ]
 
 
 def ridehail_suggestions(patterns: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -912,6 +1048,15 @@ def cashflow_buffer_suggestions(patterns: Dict[str, Any], recurring: List[Dict[s
     ]
 
 
+# (pattern feature, builder) pairs that only read ``patterns``; order is suggestion priority.
+_PATTERN_BUILDERS: Tuple[Tuple[str, Callable[[Dict[str, Any]], List[Dict[str, Any]]]], ...] = (
+    ("merchant_hhi_details", merchant_swap_suggestions),
+    ("small_leaks", drip_spend_suggestions),
+    ("late_night", late_night_suggestions),
+    ("ridehail_usage", ridehail_suggestions),
+)
+
+
 def build_challenges(
     suggestions: Sequence[Dict[str, Any]],
     patterns: Dict[str, Any],
@@ -1001,15 +1146,17 @@ def summarise(
     suggestions: List[Dict[str, Any]],
     challenges: List[Dict[str, Any]],
     variances: Dict[str, Any],
+    presorted: bool = False,
 ) -> Dict[str, Any]:
     months = ordered_months({row["month_key"] for row in rows})
     period = f"{months[0]} to {months[-1]}" if months else ""
 
-    latest_dt = max((row["dt"] for row in rows), default=None)
     total_spend_30d = 0.0
-    if latest_dt:
-        cutoff = latest_dt - timedelta(days=30)
-        total_spend_30d = sum(abs(row["amount"]) for row in rows if row.get("is_spend") and row["dt"] >= cutoff)
+    if rows:
+        cutoff = latest_timestamp(rows, presorted) - RECENT_WINDOW
+        total_spend_30d = sum(
+            row["amount_abs"] for row in rows_since(rows, cutoff, presorted) if row.get("is_spend")
+        )
 
     projected_current = variances.get("total_projection", 0.0)
 
@@ -1047,6 +1194,7 @@ def compute_top_rising_categories(trends: Dict[str, Any]) -> List[Dict[str, Any]
         return []
     current_month = months[-1]
     previous_month = months[-2]
+    threshold = CONFIG["rising_mom_threshold"]
     rising: List[Tuple[float, Dict[str, Any]]] = []
     for category, series in category_spend.items():
         curr = series.get(current_month, 0.0)
@@ -1054,21 +1202,22 @@ def compute_top_rising_categories(trends: Dict[str, Any]) -> List[Dict[str, Any]
         if curr < 15:
             continue
         change = pct_change(curr, prev)
-        if change and change >= CONFIG["rising_mom_threshold"]:
+        if change and change >= threshold:
             rising.append((change, {"category": category, "mom_pct": change}))
-    rising.sort(key=lambda item: item[0], reverse=True)
-    return [item[1] for item in rising[:3]]
+    return [item[1] for item in heapq.nlargest(3, rising, key=itemgetter(0))]
 
 
 def top_saving_opportunities(variances: Dict[str, Any]) -> List[Dict[str, Any]]:
     per_category = variances.get("per_category", {})
-    candidates = [
-        {"category": category, "amount": data["opportunity"]}
-        for category, data in per_category.items()
-        if data.get("opportunity")
-    ]
-    candidates.sort(key=lambda item: item["amount"], reverse=True)
-    return candidates[:3]
+    return heapq.nlargest(
+        3,
+        (
+            {"category": category, "amount": data["opportunity"]}
+            for category, data in per_category.items()
+            if data.get("opportunity")
+        ),
+        key=itemgetter("amount"),
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -1089,31 +1238,42 @@ def load_transactions_from_json(path: str) -> List[Dict[str, Any]]:
     file_path = os.path.expanduser(str(path))
     if not os.path.isabs(file_path):
         file_path = os.path.abspath(file_path)
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Transaction file not found: {file_path}")
     try:
-        with open(file_path, "r", encoding="utf-8") as handle:
-            data = json.load(handle)
+        if orjson is not None:
+            with open(file_path, "rb") as handle:
+                raw = handle.read()
+            try:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # orjson is stricter than json (no NaN/Infinity, 64-bit integers only);
+                # let json decide on anything it rejects so the accepted input is unchanged.
+                data = json.loads(raw.decode("utf-8"))
+        else:
+            with open(file_path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Transaction file not found: {file_path}") from exc
     except json.JSONDecodeError as exc:  # pragma: no cover - depends on file contents
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError.
         raise ValueError(f"Invalid JSON in {file_path}: {exc}") from exc
     if not isinstance(data, list):
         raise ValueError(f"Expected list of transactions in {file_path}")
-    transactions: List[Dict[str, Any]] = []
-    for idx, item in enumerate(data):
-        if not isinstance(item, dict):
-            raise ValueError(f"Transaction at index {idx} is not an object.")
-        transactions.append(item)
-    return transactions
+    bad_idx = next((idx for idx, item in enumerate(data) if not isinstance(item, dict)), None)
+    if bad_idx is not None:
+        raise ValueError(f"Transaction at index {bad_idx} is not an object.")
+    return data
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=256)
 def humanise_category(category: str) -> str:
     return category.replace(".", " ").replace("_", " ").title()
 
 
+@lru_cache(maxsize=1024)
 def format_currency(value: Optional[float]) -> str:
     if value is None:
         return "£0.00"
@@ -1134,19 +1294,60 @@ def groupby_sum(rows: Iterable[MutableMapping[str, Any]], key_fn: Callable[[Muta
     return dict(totals)
 
 
+def latest_timestamp(rows: Sequence[MutableMapping[str, Any]], presorted: bool = False) -> datetime:
+    """Most recent row dt; read from the last row when the caller guarantees time order."""
+    if presorted:
+        return rows[-1]["dt"]
+    return max(row["dt"] for row in rows)
+
+
+def rows_since(
+    rows: Sequence[MutableMapping[str, Any]], cutoff: datetime, presorted: bool = False
+) -> Sequence[MutableMapping[str, Any]]:
+    """Rows with dt >= cutoff; a tail slice that skips older rows when the input is time-ordered."""
+    if not presorted:
+        return [row for row in rows if row["dt"] >= cutoff]
+    start = len(rows)
+    while start and rows[start - 1]["dt"] >= cutoff:
+        start -= 1
+    return rows[start:]
+
+
 def rolling_mean(series: Sequence[float], window: int = 3) -> List[Optional[float]]:
     if window <= 0:
         raise ValueError("Window must be positive")
-    result: List[Optional[float]] = []
-    for idx in range(len(series)):
-        if idx + 1 < window:
-            result.append(None)
-            continue
-        segment = series[idx + 1 - window : idx + 1]
-        result.append(sum(segment) / window)
+    result: List[Optional[float]] = [None] * min(window - 1, len(series))
+    # Slide a running window total instead of re-summing each segment.
+    window_sum = sum(series[: window - 1])
+    for idx in range(window - 1, len(series)):
+        window_sum += series[idx]
+        result.append(window_sum / window)
+        window_sum -= series[idx + 1 - window]
     return result
 
 
+def mean_std(values: Iterable[float]) -> Tuple[float, float]:
+    """Single-pass (Welford) mean and sample standard deviation."""
+    count = 0
+    mean_value = 0.0
+    m2 = 0.0
+    for value in values:
+        count += 1
+        delta = value - mean_value
+        mean_value += delta / count
+        m2 += delta * (value - mean_value)
+    std_value = sqrt(m2 / (count - 1)) if count > 1 else 0.0
+    return mean_value, std_value
+
+
+def median_value(values: Sequence[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
 def pct_change(curr: float, prev: float) -> Optional[float]:
     if prev == 0:
         return None
@@ -1157,20 +1358,60 @@ def linear_trend(values: Sequence[float]) -> float:
     n = len(values)
     if n < 2:
         return 0.0
-    x = list(range(n))
-    x_mean = sum(x) / n
+    # x is 0..n-1, so its mean and spread have closed forms; no x list or extra
+    # passes over it are needed.
+    x_mean = (n - 1) / 2
     y_mean = sum(values) / n
-    denom = sum((xi - x_mean) ** 2 for xi in x)
+    denom = n * (n * n - 1) / 12
     if denom == 0:
         return 0.0
-    numer = sum((x[i] - x_mean) * (values[i] - y_mean) for i in range(n))
+    numer = sum((idx - x_mean) * (value - y_mean) for idx, value in enumerate(values))
     return numer / denom
 
 
 def percentile_value(values: Sequence[float], q: float) -> float:
-    if not values:
+    selected = _select_percentile(values, q)
+    if selected is not None:
+        return selected
+    return percentile_sorted(sorted(values), q)
+
+
+def _percentile_in_place(values: List[float], q: float) -> float:
+    """percentile_value for a list the caller owns; a full sort reorders it instead of copying."""
+    selected = _select_percentile(values, q)
+    if selected is not None:
+        return selected
+    values.sort()
+    return percentile_sorted(values, q)
+
+
+def _select_percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Percentile read from a heap-selected tail, or None when a full sort is cheaper."""
+    count = len(values)
+    if count < 2:
+        return percentile_sorted(values, q)
+    pos = (count - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, count - 1)
+    # Extreme percentiles (e.g. the 99th) only need a short tail of the data;
+    # selecting it with a heap beats a full sort once the tail is small enough.
+    if (count - lower) * PARTIAL_SELECT_RATIO <= count:
+        tail = heapq.nlargest(count - lower, values)
+        lower_value = tail[-1]
+        upper_value = tail[-2] if upper > lower else lower_value
+    elif (upper + 1) * PARTIAL_SELECT_RATIO <= count:
+        head = heapq.nsmallest(upper + 1, values)
+        lower_value, upper_value = head[lower], head[upper]
+    else:
+        return None
+    weight = pos - lower
+    return lower_value * (1 - weight) + upper_value * weight
+
+
+def percentile_sorted(ordered: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile of values that are already in ascending order."""
+    if not ordered:
         return 0.0
-    ordered = sorted(values)
     if len(ordered) == 1:
         return ordered[0]
     pos = (len(ordered) - 1) * q
@@ -1190,14 +1431,18 @@ def round_to_nearest_5(value: float) -> float:
 
 def analyse_spending(transactions: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
     rows = preprocess(transactions)
+    # Filter spend rows once and share them across every stage that needs them.
+    spend_rows = [row for row in rows if row["is_spend"]]
     trends = monthly_trends(rows)
-    patterns = pattern_mining(rows)
-    recurring = detect_recurring(rows)
-    anomalies = detect_anomalies(rows)
-    variances = compute_variances(rows)
+    # preprocess() returns rows sorted by dt, so stages can skip re-sorting and
+    # read recent windows as tail slices.
+    patterns = pattern_mining(rows, presorted=True, spend_rows=spend_rows)
+    recurring = detect_recurring(rows, presorted=True, spend_rows=spend_rows)
+    anomalies = detect_anomalies(rows, presorted=True, spend_rows=spend_rows)
+    variances = compute_variances(rows, spend_rows=spend_rows)
     suggestions = build_suggestions(trends, patterns, recurring, anomalies, variances)
     challenges = build_challenges(suggestions, patterns, variances)
-    return summarise(rows, trends, patterns, recurring, anomalies, suggestions, challenges, variances)
+    return summarise(rows, trends, patterns, recurring, anomalies, suggestions, challenges, variances, presorted=True)
 
 
 def analyze_transactions(transactions: Sequence[MutableMapping[str, Any]]) -> Dict[str, Any]:
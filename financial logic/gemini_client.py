@@ -1,8 +1,12 @@
 import json
+import math
 import os
+import string
+import threading
 from dataclasses import dataclass, field
+from datetime import date
 from functools import lru_cache
-from typing import Any, Dict, Optional, Sequence, Tuple
+from typing import Any, Dict, FrozenSet, Optional, Sequence, Tuple
 
 from dotenv import load_dotenv
 
@@ -11,6 +15,11 @@ try:  # pragma: no cover - optional dependency
 except ImportError:  # pragma: no cover - optional dependency
     genai = None
 
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 load_dotenv()
 
 MODULE_DIR = os.path.dirname(__file__)
@@ -124,16 +133,13 @@ class GeminiClient:
     def _extract_text(response: Any) -> str:
         if response is None:
             return ""
-        parts = []
-        candidates = getattr(response, "candidates", None) or []
-        for candidate in candidates:
-            content = getattr(candidate, "content", None)
-            if not content:
-                continue
-            for part in getattr(content, "parts", []) or []:
-                text = getattr(part, "text", None)
-                if text:
-                    parts.append(text)
+        parts = [
+            text
+            for candidate in getattr(response, "candidates", None) or ()
+            if (content := getattr(candidate, "content", None))
+            for part in getattr(content, "parts", None) or ()
+            if (text := getattr(part, "text", None))
+        ]
         if not parts and callable(getattr(response, "text", None)):
             try:
                 parts.append(response.text())
@@ -143,15 +149,39 @@ class GeminiClient:
 
 
 _shared_client: Optional[GeminiClient] = None
+# Guards both the shared client and the per-override cache, so concurrent callers
+# never build duplicate clients.
+_client_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _client_for_overrides(overrides: FrozenSet[Tuple[str, Any]]) -> GeminiClient:
+    return GeminiClient(**dict(overrides))
 
 
 def get_gemini_client(**overrides: Any) -> GeminiClient:
-    """Return a cached GeminiClient (new one if overrides are supplied)."""
+    """
+    Return a cached GeminiClient (one per distinct set of hashable overrides).
+
+    Cached clients are shared between callers, so treat them as read-only; pass
+    different overrides instead of reassigning fields on a returned client.
+    """
     global _shared_client
     if overrides:
-        return GeminiClient(**overrides)
+        try:
+            key = frozenset(overrides.items())
+        except TypeError:  # unhashable values such as a generation_config dict
+            return GeminiClient(**overrides)
+        with _client_lock:
+            client = _client_for_overrides(key)
+            # genai.configure is process-global; re-apply this client's key so a
+            # cache hit never runs under a key configured by another client.
+            genai.configure(api_key=client.api_key)
+        return client
     if _shared_client is None:
-        _shared_client = GeminiClient()
+        with _client_lock:
+            if _shared_client is None:
+                _shared_client = GeminiClient()
     return _shared_client
 
 
@@ -176,10 +206,52 @@ def _resolve_prompt_path(path: str) -> str:
 
 @lru_cache(maxsize=8)
 def _load_prompt_text(path: str) -> str:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Prompt file not found: {path}")
-    with open(path, "r", encoding="utf-8") as handle:
-        return handle.read()
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.read()
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Prompt file not found: {path}") from exc
+
+
+@lru_cache(maxsize=8)
+def _compile_template(template: str) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """Split a format template into (literal, field) pairs, or None if it needs full str.format."""
+    segments = []
+    for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+        if format_spec or conversion or (field_name is not None and not field_name.isidentifier()):
+            return None
+        segments.append((literal, field_name))
+    return tuple(segments)
+
+
+def _json_compatible(value: Any) -> Any:
+    """Mirror orjson for the json fallback: NaN/Infinity become null, dates become ISO strings."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _json_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_compatible(item) for item in value]
+    if isinstance(value, date):  # datetime is a date subclass
+        return value.isoformat()
+    return value
+
+
+def _dump_section(value: Any) -> str:
+    """Serialise a report section as indented JSON, using orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+        except orjson.JSONEncodeError:  # e.g. integers wider than 64 bits
+            pass
+    return json.dumps(_json_compatible(value), indent=2, ensure_ascii=False)
+
+
+def _render_template(template: str, context: Dict[str, str]) -> str:
+    segments = _compile_template(template)
+    if segments is None:
+        return template.format(**context)
+    return "".join(literal + context[name] if name is not None else literal for literal, name in segments)
 
 
 def build_suggestions_prompt(report: Dict[str, Any], prompt_path: Optional[str] = None) -> str:
@@ -187,16 +259,16 @@ def build_suggestions_prompt(report: Dict[str, Any], prompt_path: Optional[str]
     template_path = _resolve_prompt_path(prompt_path or DEFAULT_SUGGESTION_PROMPT)
     template = _load_prompt_text(template_path)
     context = {
-        "summary": json.dumps(report.get("summary", {}), indent=2),
-        "patterns": json.dumps(report.get("patterns", {}), indent=2),
-        "recurring": json.dumps(report.get("recurring", []), indent=2),
-        "anomalies": json.dumps(report.get("anomalies", []), indent=2),
-        "top_saving_opportunities": json.dumps(
-            report.get("summary", {}).get("top_saving_opportunities", []), indent=2
+        "summary": _dump_section(report.get("summary", {})),
+        "patterns": _dump_section(report.get("patterns", {})),
+        "recurring": _dump_section(report.get("recurring", [])),
+        "anomalies": _dump_section(report.get("anomalies", [])),
+        "top_saving_opportunities": _dump_section(
+            report.get("summary", {}).get("top_saving_opportunities", [])
         ),
-        "existing_suggestions": json.dumps(report.get("suggestions", []), indent=2),
+        "existing_suggestions": _dump_section(report.get("suggestions", [])),
     }
-    return template.format(**context)
+    return _render_template(template, context)
 
 
 def generate_ai_suggestions(
@@ -0,0 +1,116 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import analysis
+
+MOCK_PATH = os.path.join(os.path.dirname(__file__), "mock_transactions.json")
+
+
+def _canonical(value):
+    """JSON-normalised value with list order ignored, for order-insensitive comparisons."""
+    if isinstance(value, list):
+        return sorted((_canonical(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True))
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, float):
+        return round(value, 9)
+    return value
+
+
+def _normalised(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+class PresortedContractTests(unittest.TestCase):
+    """Stages that skip sorting for presorted rows must still handle arbitrary order."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.transactions = analysis.load_transactions_from_json(MOCK_PATH)
+        cls.rows = analysis.preprocess([dict(tx) for tx in cls.transactions])
+
+    def shuffled(self, items, seed):
+        items = [dict(item) for item in items]
+        random.Random(seed).shuffle(items)
+        return items
+
+    def test_analyse_spending_ignores_input_order(self):
+        expected = _normalised(analysis.analyse_spending([dict(tx) for tx in self.transactions]))
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                got = _normalised(analysis.analyse_spending(self.shuffled(self.transactions, seed)))
+                self.assertEqual(got, expected)
+
+    def test_stages_match_presorted_results_on_shuffled_rows(self):
+        stages = {
+            "pattern_mining": analysis.pattern_mining,
+            "detect_recurring": analysis.detect_recurring,
+            "detect_anomalies": analysis.detect_anomalies,
+        }
+        shuffled = self.shuffled(self.rows, seed=7)
+        for name, stage in stages.items():
+            with self.subTest(stage=name):
+                expected = stage([dict(row) for row in self.rows], presorted=True)
+                self.assertEqual(_canonical(_normalised(stage(shuffled))), _canonical(_normalised(expected)))
+
+    def test_summarise_30d_spend_ignores_row_order(self):
+        rows = [dict(row) for row in self.rows]
+        trends = analysis.monthly_trends(rows)
+        patterns = analysis.pattern_mining(rows, presorted=True)
+        variances = analysis.compute_variances(rows)
+        expected = analysis.summarise(rows, trends, patterns, [], [], [], [], variances, presorted=True)
+        got = analysis.summarise(list(reversed(rows)), trends, patterns, [], [], [], [], variances)
+        self.assertAlmostEqual(got["summary"]["total_spend_30d"], expected["summary"]["total_spend_30d"])
+
+    def test_potential_duplicates_on_reversed_rows(self):
+        rows = analysis.preprocess(
+            [
+                {"ts": "2024-03-01T10:00:00Z", "amount": -9.99, "merchant": "Netflix", "category": "subscriptions"},
+                {"ts": "2024-03-01T10:02:00Z", "amount": -9.99, "merchant": "Netflix", "category": "subscriptions"},
+                {"ts": "2024-03-09T10:00:00Z", "amount": -9.99, "merchant": "Netflix", "category": "subscriptions"},
+            ]
+        )
+        spend_rows = [row for row in rows if row["is_spend"]]
+        expected = analysis.potential_duplicates(spend_rows, presorted=True)
+        got = analysis.potential_duplicates(list(reversed(spend_rows)))
+        self.assertEqual(len(expected), 1)
+        self.assertEqual([row["dt"] for row in got], [row["dt"] for row in expected])
+
+
+class HelperTests(unittest.TestCase):
+    def test_dow_peaks_are_listed_in_weekday_order(self):
+        rows = analysis.preprocess([dict(tx) for tx in analysis.load_transactions_from_json(MOCK_PATH)])
+        order = {name: idx for idx, name in enumerate(analysis.DOW_NAMES)}
+        for category, peaks in analysis.pattern_mining(rows, presorted=True)["dow_peaks"].items():
+            with self.subTest(category=category):
+                self.assertEqual(peaks, sorted(peaks, key=order.__getitem__))
+
+    def test_linear_trend_flat_and_short_series(self):
+        self.assertEqual(analysis.linear_trend([4.0, 4.0, 4.0, 4.0]), 0.0)
+        self.assertEqual(analysis.linear_trend([4.0]), 0.0)
+        self.assertAlmostEqual(analysis.linear_trend([1.0, 3.0, 5.0]), 2.0)
+
+    def test_percentile_matches_full_sort(self):
+        rnd = random.Random(3)
+        for count in (0, 1, 2, 10, 200, 5000):
+            values = [rnd.uniform(0, 500) for _ in range(count)]
+            for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+                with self.subTest(count=count, q=q):
+                    expected = analysis.percentile_sorted(sorted(values), q)
+                    self.assertAlmostEqual(analysis.percentile_value(values, q), expected)
+                    self.assertAlmostEqual(analysis._percentile_in_place(list(values), q), expected)
+
+    def test_load_transactions_accepts_nan_amounts(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as handle:
+            handle.write('[{"ts": "2024-03-01T10:00:00Z", "amount": NaN, "merchant": "Tesco"}]')
+        self.addCleanup(os.remove, handle.name)
+        loaded = analysis.load_transactions_from_json(handle.name)
+        self.assertEqual(len(loaded), 1)
+        self.assertNotEqual(loaded[0]["amount"], loaded[0]["amount"])
+
+
+if __name__ == "__main__":
+    unittest.main()